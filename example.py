@@ -1,8 +1,10 @@
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import imageio.v2 as imageio
+import numpy as np
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -35,8 +37,7 @@ distance = 1.5
 cam_positions, cam_mats, eles, azis = get_camera_positions_on_sphere(
     center=(0, 0, 0), radius=distance, elevations=[30], num_per_layer=120
 )
-for camera_matrix in cam_mats:
-    scener.add_camera(camera_matrix)
+scener.add_cameras(cam_mats)
 
 # Set rendering output and render
 output_dir = "outputs"
@@ -71,12 +72,14 @@ for i in range(len(cam_positions)):
 with open(os.path.join(output_dir, "meta.json"), "w") as f:
     json.dump(meta_info, f, indent=4)
 
-# Save rendered color images to video
-rgb_images = []
-for f in sorted(os.listdir(output_dir)):
-    if f.startswith("render_"):
-        img = imageio.imread(os.path.join(output_dir, f))
-        rgb_images.append(rgba_to_rgb(img))
+# Save rendered color images to video, compositing all frames onto white at once
+files = sorted(f for f in os.listdir(output_dir) if f.startswith("render_"))
+# PNG decoding releases the GIL, so a thread pool decodes frames in parallel
+with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+    frames = np.stack(
+        list(executor.map(lambda f: imageio.imread(os.path.join(output_dir, f)), files))
+    )
+rgb_images = rgba_to_rgb(frames)
 video_path = os.path.join(output_dir, "render.mp4")
 imageio.mimsave(video_path, rgb_images, fps=24)
 print(f"Video saved to {video_path}")
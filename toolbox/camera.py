@@ -1,9 +1,10 @@
-import math
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import bpy
 import numpy as np
-from mathutils import Euler, Matrix, Vector
+from mathutils import Matrix
+
+from .util import insert_keyframes
 
 
 def init_camera(camera_lens: int = 35, camera_sensor_width: int = 32):
@@ -22,33 +23,74 @@ def get_camera_positions_on_sphere(
     elevations: List[float],
     num_per_layer: int,
 ):
-    points, mats, elevation_t, azimuth_t = [], [], [], []
-
     elevation_deg = elevations
     elevation = np.deg2rad(elevation_deg)
     azimuth_deg = np.linspace(0, 360, num_per_layer + 1)[:-1]
     azimuth_deg = azimuth_deg % 360
     azimuth = np.deg2rad(azimuth_deg)
 
-    for theta in azimuth:
-        for _phi in elevation:
-            phi = 0.5 * math.pi - _phi
-            elevation_t.append(_phi)
-            azimuth_t.append(theta)
+    # Everything depending on a single angle is evaluated on the 1D arrays, only
+    # the x / y products are formed on the full azimuth x elevation grid
+    phi = 0.5 * np.pi - elevation
+    ring_radius = radius * np.sin(phi)
+    ring_z = center[2] + radius * np.cos(phi)
+    sin_theta, cos_theta = np.sin(azimuth), np.cos(azimuth)
+
+    # Azimuth-major ordering: all elevations of one azimuth are adjacent
+    points = np.empty((len(azimuth), len(elevation), 3))
+    points[..., 0] = center[0] + np.outer(cos_theta, ring_radius)
+    points[..., 1] = center[1] + np.outer(sin_theta, ring_radius)
+    points[..., 2] = ring_z
+    points = points.reshape(-1, 3)
+
+    theta_t, elevation_t = np.meshgrid(azimuth, elevation, indexing="ij")
+    elevation_t = elevation_t.ravel().tolist()
+    azimuth_t = theta_t.ravel().tolist()
+
+    # Contiguous (N, 4, 4) array, one matrix per camera
+    mats = build_transformation_mats(
+        points, _lookat_rotations(points, center), dtype=np.float32
+    )
 
-            r = radius
-            x = center[0] + r * math.sin(phi) * math.cos(theta)
-            y = center[1] + r * math.sin(phi) * math.sin(theta)
-            z = center[2] + r * math.cos(phi)
-            cam_pos = Vector((x, y, z))
-            points.append(cam_pos)
+    return points, mats, elevation_t, azimuth_t
 
-            center = Vector(center)
-            rotation_euler = (center - cam_pos).to_track_quat("-Z", "Y").to_euler()
-            cam_matrix = build_transformation_mat(cam_pos, rotation_euler)
-            mats.append(cam_matrix)
 
-    return points, mats, elevation_t, azimuth_t
+def _lookat_rotations(
+    positions: np.ndarray,
+    center: Tuple[float, float, float],
+    up: Tuple[float, float, float] = (0, 0, 1),
+) -> np.ndarray:
+    """Build camera-to-world rotations looking from each position at the center.
+
+    Equivalent to ``(center - pos).to_track_quat("-Z", "Y")``: the camera looks
+    along its local -Z axis and its local Y axis is kept as close as possible
+    to the world ``up`` direction.
+
+    Args:
+        positions (np.ndarray): Camera positions of shape (N, 3).
+        center (Tuple[float, float, float]): The point all cameras look at.
+        up (Tuple[float, float, float], optional): World up direction.
+            Defaults to (0, 0, 1).
+
+    Returns:
+        np.ndarray: The camera-to-world rotation matrices of shape (N, 3, 3).
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    up = np.asarray(up, dtype=np.float64)
+
+    forward = np.asarray(center, dtype=np.float64) - positions
+    forward /= np.linalg.norm(forward, axis=-1, keepdims=True)
+
+    right = np.cross(forward, up)
+    right_norm = np.linalg.norm(right, axis=-1, keepdims=True)
+    # Looking straight along the up axis, any horizontal right vector is valid
+    degenerate = right_norm[:, 0] < 1e-8
+    right[degenerate] = (1.0, 0.0, 0.0)
+    right_norm[degenerate] = 1.0
+    right /= right_norm
+    true_up = np.cross(right, forward)
+
+    return np.stack([right, true_up, -forward], axis=-1)
 
 
 def add_camera(cam2world_matrix: Matrix) -> int:
@@ -67,19 +109,62 @@ def add_camera(cam2world_matrix: Matrix) -> int:
     return frame
 
 
-def build_transformation_mat(translation, rotation) -> np.ndarray:
+def add_cameras(cam2world_matrices) -> np.ndarray:
+    """Register a batch of camera poses, one per frame, after the existing ones.
+
+    Equivalent to calling ``add_camera`` for every matrix, but the location and
+    rotation keyframes are written with one bulk insert per channel.
+
+    Args:
+        cam2world_matrices: The (N, 4, 4) camera-to-world matrices.
+
+    Returns:
+        np.ndarray: The (N,) frames the poses were registered at.
+
+    Raises:
+        ValueError: If the camera's rotation mode is not XYZ Euler.
+    """
+    cam2world_matrices = np.asarray(cam2world_matrices).reshape(-1, 4, 4)
+
+    cam_ob = bpy.context.scene.camera
+    if cam_ob.rotation_mode != "XYZ":
+        raise ValueError(
+            f"Camera rotation mode must be XYZ, got {cam_ob.rotation_mode}"
+        )
+    first_frame = bpy.context.scene.frame_end
+    frames = np.arange(first_frame, first_frame + len(cam2world_matrices))
+    bpy.context.scene.frame_end = first_frame + len(cam2world_matrices)
+
+    locations = cam2world_matrices[:, :3, 3]
+    rotations = _matrix_to_euler(cam2world_matrices[:, :3, :3])
+    for index in range(3):
+        insert_keyframes(cam_ob, "location", frames, locations[:, index], index)
+        insert_keyframes(cam_ob, "rotation_euler", frames, rotations[:, index], index)
+
+    return frames
+
+
+def build_transformation_mat(
+    translation, rotation, out: Optional[np.ndarray] = None
+) -> np.ndarray:
     """Build a transformation matrix from translation and rotation parts.
 
     :param translation: A (3,) vector representing the translation part.
     :param rotation: A 3x3 rotation matrix or Euler angles of shape (3,).
+    :param out: A preallocated 4x4 array to write the matrix into. If not given, a
+        new float32 matrix is allocated.
     :return: The 4x4 transformation matrix.
     """
-    translation = np.array(translation)
-    rotation = np.array(rotation)
+    translation = np.asarray(translation)
+    rotation = np.asarray(rotation)
 
-    mat = np.eye(4)
+    if out is None:
+        mat = np.eye(4, dtype=np.float32)
+    else:
+        mat = out
+        mat[3] = (0, 0, 0, 1)
     if translation.shape[0] == 3:
-        mat[:3, 3] = translation
+        mat[:3, 3] = translation.reshape(3)
     else:
         raise RuntimeError(
             f"Translation has invalid shape: {translation.shape}. Must be (3,) or (3,1) vector."
@@ -87,7 +172,7 @@ def build_transformation_mat(translation, rotation) -> np.ndarray:
     if rotation.shape == (3, 3):
         mat[:3, :3] = rotation
     elif rotation.shape[0] == 3:
-        mat[:3, :3] = np.array(Euler(rotation).to_matrix())
+        mat[:3, :3] = _euler_to_matrix(rotation.reshape(3))
     else:
         raise RuntimeError(
             f"Rotation has invalid shape: {rotation.shape}. Must be rotation matrix of shape "
@@ -95,3 +180,72 @@ def build_transformation_mat(translation, rotation) -> np.ndarray:
         )
 
     return mat
+
+
+def build_transformation_mats(
+    translations, rotations, dtype: np.dtype = np.float64
+) -> np.ndarray:
+    """Build a batch of transformation matrices from translation and rotation parts.
+
+    :param translations: A (N, 3) array of translations.
+    :param rotations: A (N, 3, 3) array of rotation matrices or (N, 3) Euler angles.
+    :param dtype: The data type of the returned matrices.
+    :return: The (N, 4, 4) transformation matrices.
+    """
+    translations = np.asarray(translations)
+    rotations = np.asarray(rotations)
+
+    if translations.ndim != 2 or translations.shape[1] != 3:
+        raise RuntimeError(
+            f"Translations have invalid shape: {translations.shape}. Must be (N,3)."
+        )
+    if rotations.shape[1:] == (3,):
+        rotations = _euler_to_matrix(rotations)
+    elif rotations.shape[1:] != (3, 3):
+        raise RuntimeError(
+            f"Rotations have invalid shape: {rotations.shape}. Must be rotation "
+            f"matrices of shape (N,3,3) or Euler angles of shape (N,3)."
+        )
+
+    mats = np.zeros((len(translations), 4, 4), dtype=dtype)
+    mats[:, :3, :3] = rotations
+    mats[:, :3, 3] = translations
+    mats[:, 3, 3] = 1
+
+    return mats
+
+
+def _euler_to_matrix(euler: np.ndarray) -> np.ndarray:
+    """Convert XYZ Euler angles of shape (..., 3) to rotation matrices (..., 3, 3).
+
+    Same convention as ``mathutils.Euler(euler, "XYZ").to_matrix()``.
+    """
+    sx, sy, sz = np.moveaxis(np.sin(euler), -1, 0)
+    cx, cy, cz = np.moveaxis(np.cos(euler), -1, 0)
+
+    rows = [
+        [cy * cz, sx * sy * cz - cx * sz, cx * sy * cz + sx * sz],
+        [cy * sz, sx * sy * sz + cx * cz, cx * sy * sz - sx * cz],
+        [-sy, sx * cy, cx * cy],
+    ]
+    return np.stack([np.stack(row, axis=-1) for row in rows], axis=-2)
+
+
+def _matrix_to_euler(rotation: np.ndarray) -> np.ndarray:
+    """Convert rotation matrices of shape (..., 3, 3) to XYZ Euler angles (..., 3).
+
+    Inverse of ``_euler_to_matrix``.
+    """
+    cy = np.hypot(rotation[..., 0, 0], rotation[..., 1, 0])
+    # At gimbal lock only x + z (or x - z) is defined, put it all into x
+    gimbal_lock = cy < 1e-6
+
+    x = np.where(
+        gimbal_lock,
+        np.arctan2(-rotation[..., 1, 2], rotation[..., 1, 1]),
+        np.arctan2(rotation[..., 2, 1], rotation[..., 2, 2]),
+    )
+    y = np.arctan2(-rotation[..., 2, 0], cy)
+    z = np.where(gimbal_lock, 0.0, np.arctan2(rotation[..., 1, 0], rotation[..., 0, 0]))
+
+    return np.stack([x, y, z], axis=-1)
@@ -4,7 +4,10 @@ import bpy
 
 
 def init_render_engine(
-    engine: Literal["CYCLES", "BLENDER_EEVEE"], render_samples: int = 128
+    engine: Literal["CYCLES", "BLENDER_EEVEE"],
+    render_samples: int = 128,
+    quality: Literal["fast", "high"] = "fast",
+    use_denoising: bool = True,
 ):
     """Initialize the rendering engine.
 
@@ -13,28 +16,47 @@ def init_render_engine(
             The rendering engine to use. Either CYCLES or BLENDER_EEVEE.
         render_samples (int, optional):
             Number of samples to render. Defaults to 128.
+        quality (Literal[&quot;fast&quot;, &quot;high&quot;], optional):
+            "high" enables the expensive EEVEE post effects (ambient occlusion,
+            screen space reflections, bloom), "fast" skips them. Defaults to "fast".
+        use_denoising (bool, optional):
+            Whether Cycles denoises the renders. Defaults to True.
 
     Raises:
         ValueError: If the engine is not CYCLES or BLENDER_EEVEE.
     """
+    if quality not in ("fast", "high"):
+        raise ValueError(f"Unknown quality: {quality}")
+    high_quality = quality == "high"
+
     if engine == "CYCLES":
-        cycles_init(render_samples)
+        cycles_init(render_samples, use_denoising=use_denoising)
     elif engine == "BLENDER_EEVEE":
-        eevee_init(render_samples)
+        eevee_init(
+            render_samples,
+            use_gtao=high_quality,
+            use_ssr=high_quality,
+            use_bloom=high_quality,
+        )
     else:
         raise ValueError(f"Unknown engine: {engine}")
 
 
-def eevee_init(render_samples: int):
+def eevee_init(
+    render_samples: int,
+    use_gtao: bool = False,
+    use_ssr: bool = False,
+    use_bloom: bool = False,
+):
     bpy.context.scene.render.engine = "BLENDER_EEVEE"
     bpy.context.scene.eevee.taa_render_samples = render_samples
-    bpy.context.scene.eevee.use_gtao = True
-    bpy.context.scene.eevee.use_ssr = True
-    bpy.context.scene.eevee.use_bloom = True
+    bpy.context.scene.eevee.use_gtao = use_gtao
+    bpy.context.scene.eevee.use_ssr = use_ssr
+    bpy.context.scene.eevee.use_bloom = use_bloom
     bpy.context.scene.render.use_high_quality_normals = True
 
 
-def cycles_init(render_samples: int):
+def cycles_init(render_samples: int, use_denoising: bool = True):
     bpy.context.scene.render.engine = "CYCLES"
     bpy.context.scene.cycles.samples = render_samples
     bpy.context.scene.cycles.diffuse_bounces = 1
@@ -42,5 +64,5 @@ def cycles_init(render_samples: int):
     bpy.context.scene.cycles.transparent_max_bounces = 3
     bpy.context.scene.cycles.transmission_bounces = 3
     bpy.context.scene.cycles.filter_width = 0.01
-    bpy.context.scene.cycles.use_denoising = True
+    bpy.context.scene.cycles.use_denoising = use_denoising
     bpy.context.scene.render.film_transparent = True
@@ -1,5 +1,3 @@
-import os
-
 import bpy
 from mathutils import Vector
 
@@ -26,8 +24,8 @@ def set_env_map(env_path: str):
     links.new(env_texture_node.outputs["Color"], bg_node.inputs["Color"])
     links.new(bg_node.outputs["Background"], output_node.inputs["Surface"])
 
-    bpy.ops.image.open(filepath=env_path)
-    env_texture_node.image = bpy.data.images.get(os.path.basename(env_path))
+    # Reuse the image if it is already loaded instead of decoding it again
+    env_texture_node.image = bpy.data.images.load(env_path, check_existing=True)
 
 
 def set_global_light(env_light: float = 0.5):
@@ -3,6 +3,9 @@ from typing import IO, Any, Dict, List, Optional, Set, Tuple, Union
 import bpy
 import numpy as np
 
+# Fixed name of the vertex color layers created here, so their materials can be shared
+_VERTEX_COLOR_LAYER = "VCOL"
+
 
 def read_trimesh_obj(file_path):
     """Read a trimesh obj file.
@@ -19,25 +22,47 @@ def read_trimesh_obj(file_path):
         file_path (str): The path to the obj file.
 
     Returns:
-        Tuple[List[Tuple], List[Tuple], List[Tuple]]:
-            A tuple containing the vertices, colors, and faces.
+        Tuple[np.ndarray, np.ndarray, Union[np.ndarray, List[Tuple]]]:
+            A tuple containing the vertices (V, 3), colors (V, 3) and faces.
+            Faces are a 0-based (F, K) int array when all faces have the same
+            number of vertices, else a list of tuples.
     """
-    vertices, colors, faces = [], [], []
     with open(file_path, "r") as file:
-        for line in file:
-            parts = line.split()
-            if len(parts) == 0:
-                continue
-
-            if parts[0] == "v" and len(parts) == 7:  # Vertex with color
-                x, y, z = map(float, parts[1:4])
-                r, g, b = map(float, parts[4:7])
-                vertices.append((x, y, z))
-                colors.append((r, g, b))  # Normalize colors
-
-            elif parts[0] == "f" and len(parts) >= 4:  # Face
-                face = [int(idx) - 1 for idx in parts[1:]]  # Adjust for 0-based index
-                faces.append(tuple(face))
+        lines = file.read().splitlines()
+
+    # Split off the keyword like str.split does, so any whitespace is accepted
+    vertex_lines, face_lines = [], []
+    for line in lines:
+        parts = line.split(None, 1)
+        if len(parts) != 2:
+            continue
+        if parts[0] == "v":
+            vertex_lines.append(parts[1])
+        elif parts[0] == "f":
+            face_lines.append(parts[1])
+
+    # Vertex with color: x y z r g b
+    vertex_data = np.fromstring(" ".join(vertex_lines), sep=" ")
+    if vertex_data.size != 6 * len(vertex_lines):
+        raise ValueError(f"Expected 'v x y z r g b' vertex lines in {file_path}")
+    vertex_data = vertex_data.reshape(-1, 6)
+    vertices = vertex_data[:, :3]
+    colors = vertex_data[:, 3:]
+
+    # Adjust for 0-based index
+    face_data = np.fromstring(" ".join(face_lines), dtype=np.int64, sep=" ") - 1
+    face_sizes = np.fromiter(map(len, map(str.split, face_lines)), dtype=np.int64)
+    # np.fromstring stops early on tokens it can't parse, e.g. "3/3"
+    if face_data.size != face_sizes.sum():
+        raise ValueError(f"Expected 'f i j k ...' face lines in {file_path}")
+    if face_data.size and (face_data.min() < 0 or face_data.max() >= len(vertices)):
+        raise ValueError(f"Face vertex index out of range in {file_path}")
+    face_size = face_sizes[0] if len(face_sizes) else 3
+    if (face_sizes == face_size).all():
+        faces = face_data.reshape(-1, face_size)
+    else:  # Mixed polygon sizes
+        bounds = np.cumsum(face_sizes)[:-1]
+        faces = [tuple(face.tolist()) for face in np.split(face_data, bounds)]
 
     return vertices, colors, faces
 
@@ -70,62 +95,50 @@ def import_vertex_colored_models(
     bpy.context.collection.objects.link(obj)
 
     # Create vertices
-    mesh.from_pydata(vertices, [], faces)
+    if isinstance(faces, np.ndarray):
+        num_faces, face_size = faces.shape
+        mesh.vertices.add(len(vertices))
+        mesh.loops.add(faces.size)
+        mesh.polygons.add(num_faces)
+
+        mesh.vertices.foreach_set(
+            "co", np.ascontiguousarray(vertices, dtype=np.float32).ravel()
+        )
+        mesh.loops.foreach_set(
+            "vertex_index", np.ascontiguousarray(faces, dtype=np.int32).ravel()
+        )
+        mesh.polygons.foreach_set(
+            "loop_start", np.arange(num_faces, dtype=np.int32) * face_size
+        )
+        mesh.polygons.foreach_set(
+            "loop_total", np.full(num_faces, face_size, dtype=np.int32)
+        )
+    else:
+        mesh.from_pydata(vertices.tolist(), [], faces)
 
     # Create a vertex color layer
-    color_layer = mesh.vertex_colors.new()
-
-    # Assign colors to each vertex
-    for poly in mesh.polygons:  # Iterate over all polygons
-        for idx in poly.loop_indices:  # Iterate over all loop indices in the polygon
-            loop = mesh.loops[idx]
-            vertex_index = loop.vertex_index
-
-            if vertex_color is not None:
-                color_layer.data[idx].color = vertex_color + (1.0,)  # RGB + Alpha
-            else:
-                color_layer.data[idx].color = colors[vertex_index] + (1.0,)
-
-    # Update mesh with new data
-    mesh.update()
-
-    # Ensure the mesh is linked to the object
-    obj.data = mesh
-
-    # Create a new material
-    material = bpy.data.materials.new(name="VertexColorMaterial")
-
-    # Use nodes for the material
-    material.use_nodes = True
-    nodes = material.node_tree.nodes
-
-    # Clear all nodes to start clean
-    for node in nodes:
-        nodes.remove(node)
-
-    # Create a Vertex Color node
-    vertex_color_node = nodes.new(type="ShaderNodeVertexColor")
-    vertex_color_node.layer_name = color_layer.name  # Use the name of your color layer
-
-    # Create a Diffuse BSDF node
-    diffuse_node = nodes.new(type="ShaderNodeBsdfDiffuse")
+    color_layer = mesh.vertex_colors.new(name=_VERTEX_COLOR_LAYER)
 
-    # Create an Output node
-    output_node = nodes.new(type="ShaderNodeOutputMaterial")
+    # Assign colors to each loop in one bulk write
+    num_loops = len(mesh.loops)
+    if vertex_color is not None:
+        loop_colors = np.tile(tuple(vertex_color) + (1.0,), (num_loops, 1))
+    else:
+        loop_vertex_indices = np.empty(num_loops, dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_vertex_indices)
+        loop_colors = np.ones((num_loops, 4))
+        loop_colors[:, :3] = colors[loop_vertex_indices]  # RGB + Alpha
+    color_layer.data.foreach_set("color", loop_colors.astype(np.float32).ravel())
 
-    # Link nodes
-    material.node_tree.links.new(
-        vertex_color_node.outputs["Color"], diffuse_node.inputs["Color"]
-    )
-    material.node_tree.links.new(
-        diffuse_node.outputs["BSDF"], output_node.inputs["Surface"]
-    )
+    # Update mesh with new data, deriving edges from the polygons
+    mesh.update(calc_edges=True)
 
     # Assign material to object
-    if obj.data.materials:
-        obj.data.materials[0] = material
+    material = _get_or_build_vertex_color_material(color_layer.name)
+    if mesh.materials:
+        mesh.materials[0] = material
     else:
-        obj.data.materials.append(material)
+        mesh.materials.append(material)
 
     return {"FINISHED"}
 
@@ -142,22 +155,41 @@ def modify_obj_vertex_color(obj: bpy.types.Object, color: Tuple):
     """
     mesh = obj.data
 
-    # Create a vertex color layer
-    color_layer = mesh.vertex_colors.new()
+    # Reuse the active vertex color layer instead of stacking up new ones
+    color_layer = mesh.vertex_colors.active or mesh.vertex_colors.new(
+        name=_VERTEX_COLOR_LAYER
+    )
 
-    # Assign colors to each vertex
-    for poly in mesh.polygons:  # Iterate over all polygons
-        for idx in poly.loop_indices:  # Iterate over all loop indices in the polygon
-            color_layer.data[idx].color = color + (1.0,)  # RGB + Alpha
+    # Assign colors to each loop in one bulk write
+    loop_colors = np.tile(tuple(color) + (1.0,), (len(mesh.loops), 1))  # RGB + Alpha
+    color_layer.data.foreach_set("color", loop_colors.astype(np.float32).ravel())
 
     # Update mesh with new data
     mesh.update()
 
-    # Ensure the mesh is linked to the object
-    obj.data = mesh
+    # Assign material to object
+    material = _get_or_build_vertex_color_material(color_layer.name)
+    if mesh.materials:
+        mesh.materials[0] = material
+    else:
+        mesh.materials.append(material)
+
+    return obj
+
+
+def _get_or_build_vertex_color_material(layer_name: str) -> bpy.types.Material:
+    """Get a diffuse material colored by the given vertex color layer.
+
+    The material is built once per layer name and shared afterwards, so repeated
+    imports don't pile up identical materials (and shader compilations).
+    """
+    name = f"VertexColorMaterial_{layer_name}"
+    material = bpy.data.materials.get(name)
+    if material is not None:
+        return material
 
     # Create a new material
-    material = bpy.data.materials.new(name="VertexColorMaterial")
+    material = bpy.data.materials.new(name=name)
 
     # Use nodes for the material
     material.use_nodes = True
@@ -169,7 +201,7 @@ def modify_obj_vertex_color(obj: bpy.types.Object, color: Tuple):
 
     # Create a Vertex Color node
     vertex_color_node = nodes.new(type="ShaderNodeVertexColor")
-    vertex_color_node.layer_name = color_layer.name  # Use the name of your color layer
+    vertex_color_node.layer_name = layer_name
 
     # Create a Diffuse BSDF node
     diffuse_node = nodes.new(type="ShaderNodeBsdfDiffuse")
@@ -185,13 +217,7 @@ def modify_obj_vertex_color(obj: bpy.types.Object, color: Tuple):
         diffuse_node.outputs["BSDF"], output_node.inputs["Surface"]
     )
 
-    # Assign material to object
-    if obj.data.materials:
-        obj.data.materials[0] = material
-    else:
-        obj.data.materials.append(material)
-
-    return obj
+    return material
 
 
 def preprocess_obj(obj: bpy.types.Object, smooth_angle: float = 30.0):
@@ -1,11 +1,46 @@
 import math
 import os
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 import bpy
 import mathutils
+import numpy as np
 
-from .util import get_local2world_mat
+from .util import insert_keyframes
+
+
+def _get_camera_matrices(camera, frames) -> np.ndarray:
+    """Evaluate the camera's local2world matrices at the given frames.
+
+    The animated location and rotation are read from the camera's F-curves, so no
+    frame change (and depsgraph evaluation) is needed per frame.
+
+    :return: The (N, 4, 4) local2world matrices.
+    """
+    # Static transformation of the parents (identity if the camera has none)
+    if camera.parent is not None:
+        parent_mat = np.asarray(camera.parent.matrix_world) @ np.asarray(
+            camera.matrix_parent_inverse
+        )
+    else:
+        parent_mat = np.eye(4)
+
+    action = camera.animation_data.action if camera.animation_data else None
+    mats = np.empty((len(frames), 4, 4))
+    for i, frame in enumerate(frames):
+        location = list(camera.location)
+        rotation = list(camera.rotation_euler)
+        if action is not None:
+            for fcurve in action.fcurves:
+                if fcurve.data_path == "location":
+                    location[fcurve.array_index] = fcurve.evaluate(frame)
+                elif fcurve.data_path == "rotation_euler":
+                    rotation[fcurve.array_index] = fcurve.evaluate(frame)
+        mats[i] = mathutils.Matrix.LocRotScale(
+            location, mathutils.Euler(rotation, camera.rotation_mode), camera.scale
+        )
+
+    return parent_mat @ mats
 
 
 def set_color_output(
@@ -13,30 +48,47 @@ def set_color_output(
     height: int,
     output_dir: Optional[str] = "",
     file_prefix: str = "render_",
+    video: bool = False,
+    fps: int = 24,
+    color_depth: Literal["8", "16"] = "8",
+    color_mode: Literal["RGBA", "RGB"] = "RGBA",
 ):
     scene = bpy.context.scene
     scene.render.resolution_x = width
     scene.render.resolution_y = height
     scene.render.resolution_percentage = 100
-    scene.render.image_settings.file_format = "PNG"
-    scene.render.image_settings.color_mode = "RGBA"
-    scene.render.image_settings.color_depth = "16"
-    scene.render.film_transparent = True
+    if video:
+        # Encode frames straight into an H.264 mp4 instead of writing PNGs.
+        # H.264 has no alpha channel, so the world is rendered as background.
+        scene.render.image_settings.file_format = "FFMPEG"
+        scene.render.image_settings.color_mode = "RGB"
+        scene.render.ffmpeg.format = "MPEG4"
+        scene.render.ffmpeg.codec = "H264"
+        scene.render.fps = fps
+        scene.render.film_transparent = False
+    else:
+        # 8 bit is enough for images ending up in 8 bit videos, 16 bit keeps more
+        # precision for further processing
+        scene.render.image_settings.file_format = "PNG"
+        scene.render.image_settings.color_mode = color_mode
+        scene.render.image_settings.color_depth = color_depth
+        # Without alpha, the world is rendered as background
+        scene.render.film_transparent = color_mode == "RGBA"
     scene.render.filepath = os.path.join(output_dir, file_prefix)
 
 
 def enable_normals_output(output_dir: Optional[str] = "", file_prefix: str = "normal_"):
-    bpy.context.scene.render.use_compositing = True
-    bpy.context.scene.use_nodes = True
+    scene = bpy.context.scene
+    scene.render.use_compositing = True
+    scene.use_nodes = True
 
-    tree = bpy.context.scene.node_tree
+    tree = scene.node_tree
 
     if "Render Layers" not in tree.nodes:
         rl = tree.nodes.new("CompositorNodeRLayers")
     else:
         rl = tree.nodes["Render Layers"]
     bpy.context.view_layer.use_pass_normal = True
-    bpy.context.scene.render.use_compositing = True
 
     separate_rgba = tree.nodes.new("CompositorNodeSepRGBA")
     space_between_nodes_x = 200
@@ -53,11 +105,12 @@ def enable_normals_output(output_dir: Optional[str] = "", file_prefix: str = "no
     multiplication_values: List[List[bpy.types.Node]] = [[], [], []]
     channel_results = {}
     for row_index, channel in enumerate(c_channels):
-        # matrix multiplication
-        mulitpliers = []
+        # matrix multiplication, accumulated as x * m0 + y * m1 + z * m2 through a
+        # chain of multiply-add nodes
+        multiply = None
         for column in range(3):
+            previous = multiply
             multiply = tree.nodes.new("CompositorNodeMath")
-            multiply.operation = "MULTIPLY"
             # setting at the end for all frames
             multiply.inputs[1].default_value = 0
             multiply.location.x = column * space_between_nodes_x + offset
@@ -65,63 +118,54 @@ def enable_normals_output(output_dir: Optional[str] = "", file_prefix: str = "no
             tree.links.new(
                 separate_rgba.outputs[c_channels[column]], multiply.inputs[0]
             )
-            mulitpliers.append(multiply)
+            if previous is None:
+                multiply.operation = "MULTIPLY"
+            else:
+                multiply.operation = "MULTIPLY_ADD"
+                tree.links.new(previous.outputs["Value"], multiply.inputs[2])
             multiplication_values[row_index].append(multiply)
 
-        first_add = tree.nodes.new("CompositorNodeMath")
-        first_add.operation = "ADD"
-        first_add.location.x = space_between_nodes_x * 5 + offset
-        first_add.location.y = row_index * space_between_nodes_y
-        tree.links.new(mulitpliers[0].outputs["Value"], first_add.inputs[0])
-        tree.links.new(mulitpliers[1].outputs["Value"], first_add.inputs[1])
-
-        second_add = tree.nodes.new("CompositorNodeMath")
-        second_add.operation = "ADD"
-        second_add.location.x = space_between_nodes_x * 6 + offset
-        second_add.location.y = row_index * space_between_nodes_y
-        tree.links.new(first_add.outputs["Value"], second_add.inputs[0])
-        tree.links.new(mulitpliers[2].outputs["Value"], second_add.inputs[1])
-
-        channel_results[channel] = second_add
-
-    rot_around_x_axis = mathutils.Matrix.Rotation(math.radians(-90.0), 4, "X")
-    for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end):
-        bpy.context.scene.frame_set(frame)
-        used_rotation_matrix = (
-            get_local2world_mat(bpy.context.scene.camera) @ rot_around_x_axis
-        )
-        for row_index in range(3):
-            for column_index in range(3):
-                current_multiply = multiplication_values[row_index][column_index]
-                current_multiply.inputs[1].default_value = used_rotation_matrix[
-                    column_index
-                ][row_index]
-                current_multiply.inputs[1].keyframe_insert(
-                    data_path="default_value", frame=frame
-                )
+        channel_results[channel] = multiply
+
+    rot_around_x_axis = np.asarray(
+        mathutils.Matrix.Rotation(math.radians(-90.0), 4, "X")
+    )
+    frames = np.arange(scene.frame_start, scene.frame_end)
+    used_rotation_matrices = (
+        _get_camera_matrices(scene.camera, frames) @ rot_around_x_axis
+    )
+    for row_index in range(3):
+        for column_index in range(3):
+            current_multiply = multiplication_values[row_index][column_index]
+            insert_keyframes(
+                tree,
+                current_multiply.inputs[1].path_from_id("default_value"),
+                frames,
+                used_rotation_matrices[:, column_index, row_index],
+            )
 
     offset = 8 * space_between_nodes_x
     for index, channel in enumerate(c_channels):
-        multiply = tree.nodes.new("CompositorNodeMath")
-        multiply.operation = "MULTIPLY"
-        multiply.location.x = space_between_nodes_x * 2 + offset
-        multiply.location.y = index * space_between_nodes_y
-        tree.links.new(channel_results[channel].outputs["Value"], multiply.inputs[0])
-        multiply.inputs[1].default_value = 0.5
+        # map [-1, 1] to [0, 1]: value * 0.5 + 0.5 (G is flipped)
+        multiply_add = tree.nodes.new("CompositorNodeMath")
+        multiply_add.operation = "MULTIPLY_ADD"
+        multiply_add.location.x = space_between_nodes_x * 2 + offset
+        multiply_add.location.y = index * space_between_nodes_y
+        tree.links.new(
+            channel_results[channel].outputs["Value"], multiply_add.inputs[0]
+        )
+        multiply_add.inputs[1].default_value = 0.5
         if channel == "G":
-            multiply.inputs[1].default_value = -0.5
-        add = tree.nodes.new("CompositorNodeMath")
-        add.operation = "ADD"
-        add.location.x = space_between_nodes_x * 3 + offset
-        add.location.y = index * space_between_nodes_y
-        tree.links.new(multiply.outputs["Value"], add.inputs[0])
-        add.inputs[1].default_value = 0.5
+            multiply_add.inputs[1].default_value = -0.5
+        multiply_add.inputs[2].default_value = 0.5
         output_channel = channel
         if channel == "G":
             output_channel = "B"
         elif channel == "B":
             output_channel = "G"
-        tree.links.new(add.outputs["Value"], combine_rgba.inputs[output_channel])
+        tree.links.new(
+            multiply_add.outputs["Value"], combine_rgba.inputs[output_channel]
+        )
 
     normal_file_output = tree.nodes.new("CompositorNodeOutputFile")
     normal_file_output.base_path = output_dir
@@ -134,10 +178,11 @@ def enable_normals_output(output_dir: Optional[str] = "", file_prefix: str = "no
 
 
 def enable_depth_output(output_dir: Optional[str] = "", file_prefix: str = "depth_"):
-    bpy.context.scene.render.use_compositing = True
-    bpy.context.scene.use_nodes = True
+    scene = bpy.context.scene
+    scene.render.use_compositing = True
+    scene.use_nodes = True
 
-    tree = bpy.context.scene.node_tree
+    tree = scene.node_tree
     links = tree.links
 
     if "Render Layers" not in tree.nodes:
@@ -157,10 +202,11 @@ def enable_depth_output(output_dir: Optional[str] = "", file_prefix: str = "dept
 
 
 def enable_albedo_output(output_dir: Optional[str] = "", file_prefix: str = "albedo_"):
-    bpy.context.scene.render.use_compositing = True
-    bpy.context.scene.use_nodes = True
+    scene = bpy.context.scene
+    scene.render.use_compositing = True
+    scene.use_nodes = True
 
-    tree = bpy.context.scene.node_tree
+    tree = scene.node_tree
 
     if "Render Layers" not in tree.nodes:
         rl = tree.nodes.new("CompositorNodeRLayers")
@@ -191,9 +237,21 @@ def enable_pbr_output(output_dir, attr_name, color_mode="RGBA", file_prefix: str
         material.use_nodes = True
         node_tree = material.node_tree
         nodes = node_tree.nodes
-        roughness_input = nodes["Principled BSDF"].inputs[attr_name]
+
+        # Skip materials already writing this AOV, e.g. on repeated calls
+        if any(
+            node.bl_idname == "ShaderNodeOutputAOV" and node.name == attr_name
+            for node in nodes
+        ):
+            continue
+        principled = next(
+            (node for node in nodes if node.type == "BSDF_PRINCIPLED"), None
+        )
+        if principled is None:
+            continue
+
+        roughness_input = principled.inputs[attr_name]
         if roughness_input.is_linked:
-            linked_node = roughness_input.links[0].from_node
             linked_socket = roughness_input.links[0].from_socket
 
             aov_output = nodes.new("ShaderNodeOutputAOV")
@@ -204,10 +262,8 @@ def enable_pbr_output(output_dir, attr_name, color_mode="RGBA", file_prefix: str
             fixed_roughness = roughness_input.default_value
             if isinstance(fixed_roughness, float):
                 roughness_value = nodes.new("ShaderNodeValue")
-                input_idx = 1
             else:
                 roughness_value = nodes.new("ShaderNodeRGB")
-                input_idx = 0
 
             roughness_value.outputs[0].default_value = fixed_roughness
 
@@ -222,16 +278,27 @@ def enable_pbr_output(output_dir, attr_name, color_mode="RGBA", file_prefix: str
     else:
         rl = tree.nodes["Render Layers"]
 
-    roughness_file_output = tree.nodes.new(type="CompositorNodeOutputFile")
+    # Repeated calls reuse the file output of the attribute instead of writing
+    # every image a second time
+    output_name = attr_name.replace(" ", "") + "Output"
+    roughness_file_output = tree.nodes.get(output_name)
+    is_new_output = roughness_file_output is None
+    if is_new_output:
+        roughness_file_output = tree.nodes.new(type="CompositorNodeOutputFile")
+        roughness_file_output.name = output_name
     roughness_file_output.base_path = output_dir
     roughness_file_output.file_slots[0].use_node_format = True
     roughness_file_output.format.file_format = "PNG"
     roughness_file_output.format.color_mode = color_mode
     roughness_file_output.format.color_depth = "16"
     roughness_file_output.file_slots.values()[0].path = file_prefix
+    if not is_new_output:
+        return
 
-    bpy.ops.scene.view_layer_add_aov()
-    bpy.context.scene.view_layers["ViewLayer"].active_aov.name = attr_name
+    view_layer = bpy.context.view_layer
+    if attr_name not in view_layer.aovs:
+        bpy.ops.scene.view_layer_add_aov()
+        view_layer.active_aov.name = attr_name
     roughness_alpha = tree.nodes.new(type="CompositorNodeSetAlpha")
     tree.links.new(rl.outputs[attr_name], roughness_alpha.inputs["Image"])
     tree.links.new(rl.outputs["Alpha"], roughness_alpha.inputs["Alpha"])
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import tempfile
+from typing import List, Optional, Tuple
+
+import bpy
+
+
+def split_frame_range(
+    frame_start: int, frame_end: int, num_parts: int
+) -> List[Tuple[int, int]]:
+    """Split the frames [frame_start, frame_end] into contiguous inclusive ranges.
+
+    Args:
+        frame_start (int): The first frame.
+        frame_end (int): The last frame (inclusive).
+        num_parts (int): The maximum number of ranges.
+
+    Returns:
+        List[Tuple[int, int]]: The (start, end) frame ranges, both inclusive.
+    """
+    num_frames = frame_end - frame_start + 1
+    num_parts = max(1, min(num_parts, num_frames))
+    bounds = [frame_start + num_frames * i // num_parts for i in range(num_parts + 1)]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(num_parts)]
+
+
+def render_parallel(num_procs: int, gpu_ids: Optional[List[int]] = None):
+    """Render the frames of the current scene with several Blender processes.
+
+    The scene is saved to a temporary .blend file, and every worker renders a
+    disjoint frame range of it in background mode, pinned to one GPU through
+    ``CUDA_VISIBLE_DEVICES``. The pinning only affects Cycles on CUDA / OptiX,
+    EEVEE workers all render on the default GPU. Image outputs are numbered by
+    frame, so they end up exactly as with a serial render. Video outputs are
+    rendered in parts and concatenated with FFmpeg afterwards.
+
+    Args:
+        num_procs (int): Number of Blender processes to run.
+        gpu_ids (List[int], *optional*, defaults to None):
+            GPU of each worker. Defaults to one GPU per worker, i.e. 0..num_procs-1.
+
+    Raises:
+        ValueError: If gpu_ids is empty.
+        RuntimeError: If a worker process fails.
+    """
+    if gpu_ids is not None and len(gpu_ids) == 0:
+        raise ValueError("gpu_ids must not be empty")
+
+    scene = bpy.context.scene
+    # Last registered camera pose is at frame_end - 1, see add_camera
+    ranges = split_frame_range(scene.frame_start, scene.frame_end - 1, num_procs)
+    if gpu_ids is None:
+        gpu_ids = list(range(len(ranges)))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        blend_path = os.path.join(tmp_dir, "scene.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
+
+        procs = []
+        try:
+            for worker_idx, (start, end) in enumerate(ranges):
+                env = dict(os.environ)
+                env["CUDA_VISIBLE_DEVICES"] = str(gpu_ids[worker_idx % len(gpu_ids)])
+                cmd = [bpy.app.binary_path, "-b", blend_path]
+                cmd += ["-s", str(start), "-e", str(end), "-a"]
+                procs.append(subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL))
+
+            for proc, (start, end) in zip(procs, ranges):
+                if proc.wait() != 0:
+                    raise RuntimeError(
+                        f"Render worker for frames {start}-{end} failed with exit "
+                        f"code {proc.returncode}"
+                    )
+        finally:
+            # Don't leave workers writing frames after a failure
+            for proc in procs:
+                if proc.poll() is None:
+                    proc.terminate()
+                    proc.wait()
+
+    if scene.render.image_settings.file_format == "FFMPEG" and len(ranges) > 1:
+        _concat_videos(ranges)
+
+
+def _concat_videos(ranges: List[Tuple[int, int]]):
+    """Concatenate the per-range videos into one named after the full range."""
+    import imageio_ffmpeg
+
+    prefix = bpy.path.abspath(bpy.context.scene.render.filepath)
+    part_paths = [f"{prefix}{start:04d}-{end:04d}.mp4" for start, end in ranges]
+    video_path = f"{prefix}{ranges[0][0]:04d}-{ranges[-1][1]:04d}.mp4"
+
+    list_path = f"{prefix}parts.txt"
+    with open(list_path, "w") as f:
+        for part_path in part_paths:
+            f.write(f"file '{os.path.abspath(part_path)}'\n")
+
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error"]
+    cmd += ["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", video_path]
+    subprocess.run(cmd, check=True)
+
+    for path in part_paths + [list_path]:
+        os.remove(path)
@@ -1,10 +1,13 @@
-import math
+import os
+from functools import lru_cache, partial
+from itertools import chain
 from typing import Literal, Optional, Tuple
 
 import bpy
+import numpy as np
 from mathutils import Vector
 
-from .camera import add_camera, init_camera
+from .camera import add_camera, add_cameras, init_camera
 from .engine import init_render_engine
 from .light import set_env_map, set_global_light
 from .object import (
@@ -12,7 +15,34 @@ from .object import (
     modify_obj_vertex_color,
     preprocess_obj,
 )
-from .output import *
+from .parallel import render_parallel
+
+
+@lru_cache(maxsize=None)
+def _get_output_dispatch():
+    """Get the functions enabling the extra outputs of each output type.
+
+    They are called with output_dir, "color" and "video" are handled by
+    set_color_output. Built on first use, so importing the toolbox doesn't import
+    the output module.
+    """
+    from .output import (
+        enable_albedo_output,
+        enable_depth_output,
+        enable_normals_output,
+        enable_pbr_output,
+    )
+
+    return {
+        "normal": [enable_normals_output],
+        "depth": [enable_depth_output],
+        "albedo": [enable_albedo_output],
+        "pbr": [
+            partial(enable_pbr_output, attr_name="Roughness", color_mode="RGBA"),
+            partial(enable_pbr_output, attr_name="Base Color", color_mode="RGBA"),
+            partial(enable_pbr_output, attr_name="Metallic", color_mode="RGBA"),
+        ],
+    }
 
 
 class SceneHandler:
@@ -20,8 +50,8 @@ class SceneHandler:
         self.clear_scene()
 
         # Prepare functions
-        self.init_camera = init_camera
         self.add_camera = add_camera
+        self.add_cameras = add_cameras
         self.init_render_engine = init_render_engine
 
     @property
@@ -30,22 +60,52 @@ class SceneHandler:
 
     @property
     def scene_meshes(self):
-        return [obj for obj in bpy.context.scene.objects if obj.type == "MESH"]
+        if self._scene_meshes is None:
+            self._scene_meshes = [
+                obj for obj in bpy.context.scene.objects if obj.type == "MESH"
+            ]
+        return self._scene_meshes
 
     @property
     def data_meshes(self):
-        return [obj for obj in bpy.data.objects if obj.type == "MESH"]
+        if self._data_meshes is None:
+            self._data_meshes = [obj for obj in bpy.data.objects if obj.type == "MESH"]
+        return self._data_meshes
+
+    def _iter_scene_meshes(self):
+        """Iterate the scene meshes without building the cached list."""
+        if self._scene_meshes is not None:
+            return iter(self._scene_meshes)
+        return (obj for obj in bpy.context.scene.objects if obj.type == "MESH")
+
+    def _iter_data_meshes(self):
+        """Iterate the data meshes without building the cached list."""
+        if self._data_meshes is not None:
+            return iter(self._data_meshes)
+        return (obj for obj in bpy.data.objects if obj.type == "MESH")
 
     @property
     def root_objects(self):
-        for obj in bpy.context.scene.objects.values():
-            if not obj.parent:
-                yield obj
+        if self._root_objects is None:
+            self._root_objects = [
+                obj for obj in bpy.context.scene.objects.values() if not obj.parent
+            ]
+        return self._root_objects
 
     @property
     def bbox(self):
         return self.get_scene_bbox()
 
+    def _invalidate_object_cache(self):
+        """Drop the cached object lists after scene edits."""
+        self._scene_meshes = None
+        self._data_meshes = None
+        self._root_objects = None
+
+    def init_camera(self, camera_lens: int = 35, camera_sensor_width: int = 32):
+        self._invalidate_object_cache()
+        return init_camera(camera_lens, camera_sensor_width)
+
     def set_env_light(self, env_path: Optional[str] = None, env_light: float = 1.0):
         if env_path is not None:
             set_env_map(env_path)
@@ -57,21 +117,25 @@ class SceneHandler:
         output_dir: str,
         width: int,
         height: int,
-        output_types: [Literal["color", "normal", "depth", "albedo", "pbr"]],
+        output_types: [Literal["color", "video", "normal", "depth", "albedo", "pbr"]],
+        color_depth: Literal["8", "16"] = "8",
     ):
+        from .output import set_color_output
+
         os.makedirs(output_dir, exist_ok=True)
-        set_color_output(width, height, output_dir)
-
-        if "normal" in output_types:
-            enable_normals_output(output_dir)
-        if "depth" in output_types:
-            enable_depth_output(output_dir)
-        if "albedo" in output_types:
-            enable_albedo_output(output_dir)
-        if "pbr" in output_types:
-            enable_pbr_output(output_dir, attr_name="Roughness", color_mode="RGBA")
-            enable_pbr_output(output_dir, attr_name="Base Color", color_mode="RGBA")
-            enable_pbr_output(output_dir, attr_name="Metallic", color_mode="RGBA")
+        set_color_output(
+            width,
+            height,
+            output_dir,
+            video="video" in output_types,
+            color_depth=color_depth,
+        )
+
+        output_dispatch = _get_output_dispatch()
+        # Deduplicate while keeping the requested order
+        for output_type in dict.fromkeys(output_types):
+            for enable_output in output_dispatch.get(output_type, ()):
+                enable_output(output_dir)
 
     def import_object(
         self,
@@ -81,6 +145,7 @@ class SceneHandler:
         up_axis: str = "Z",
         vertex_color: Vector = None,
     ):
+        self._invalidate_object_cache()
         if type == "vertex_colored":
             result = import_vertex_colored_models(filepath, vertex_color)
         elif type == "obj":
@@ -101,64 +166,110 @@ class SceneHandler:
             raise Exception(f"Failed to import vrm: {result}")
 
     def modify_vertex_color(self, vertex_color: Tuple[float, float, float]):
-        for obj in self.data_meshes:
+        self._invalidate_object_cache()
+        # Objects sharing mesh data only need it recolored once
+        for obj in {obj.data: obj for obj in self._iter_data_meshes()}.values():
             modify_obj_vertex_color(obj, vertex_color)
 
     def preprocess_objs(self):
-        for obj in self.scene_meshes:
-            preprocess_obj(obj)
-
-        for obj in self.data_meshes:
+        self._invalidate_object_cache()
+        scene_meshes = set(self._iter_scene_meshes())
+        # Scene meshes are a subset of the data meshes, so one pass covers both
+        for obj in self._iter_data_meshes():
+            if obj in scene_meshes:
+                preprocess_obj(obj)
             if obj.animation_data is not None:
                 obj.animation_data_clear()
 
     def get_scene_bbox(self, single_obj=None, ignore_matrix=False):
-        bbox_min = (math.inf,) * 3
-        bbox_max = (-math.inf,) * 3
+        if single_obj is not None and ignore_matrix:
+            # The local bound_box is axis aligned, corners 0 and 6 are min and max
+            corners = single_obj.bound_box
+            return Vector(corners[0]), Vector(corners[6])
 
-        meshes = self.scene_meshes if single_obj is None else [single_obj]
-        if len(meshes) == 0:
+        meshes = self._iter_scene_meshes() if single_obj is None else iter([single_obj])
+        first = next(meshes, None)
+        if first is None:
             raise RuntimeError("No objects in scene to compute bounding box for")
 
-        for obj in meshes:
-            for coord in obj.bound_box:
-                coord = Vector(coord)
-                if not ignore_matrix:
-                    coord = obj.matrix_world @ coord
-                bbox_min = tuple(min(x, y) for x, y in zip(bbox_min, coord))
-                bbox_max = tuple(max(x, y) for x, y in zip(bbox_max, coord))
-
+        bbox_min, bbox_max = _get_meshes_bbox(chain([first], meshes), ignore_matrix)
         return Vector(bbox_min), Vector(bbox_max)
 
     def normalize_scene(self, range: float = 1.0):
-        bbox_min, bbox_max = self.bbox
-        scale = range / (bbox_max - bbox_min).length
+        # Group the meshes by the root object whose transform they inherit
+        meshes_per_root = {}
+        for obj in self._iter_scene_meshes():
+            root = obj
+            while root.parent:
+                root = root.parent
+            meshes_per_root.setdefault(root, []).append(obj)
+        if len(meshes_per_root) == 0:
+            raise RuntimeError("No objects in scene to compute bounding box for")
+
+        # (R, 2, 3) min / max corners of the meshes under each root
+        root_bboxes = np.array(
+            [_get_meshes_bbox(meshes) for meshes in meshes_per_root.values()]
+        )
+        bbox_min = root_bboxes[:, 0].min(axis=0)
+        bbox_max = root_bboxes[:, 1].max(axis=0)
+        scale = range / np.linalg.norm(bbox_max - bbox_min)
+
+        # Scaling a root object about its origin maps the bounding box of its meshes
+        # to origin + scale * (bbox - origin), so the bounding box of the scaled
+        # scene follows without evaluating the scene again
+        origins = np.array([root.matrix_world.translation for root in meshes_per_root])
+        root_bboxes = origins[:, None] + scale * (root_bboxes - origins[:, None])
+        bbox_min = root_bboxes[:, 0].min(axis=0)
+        bbox_max = root_bboxes[:, 1].max(axis=0)
+        offset = Vector(-(bbox_min + bbox_max) / 2)
 
-        # Apply scale to objects
+        # Apply scale to objects and translate to origin
         for obj in self.root_objects:
             obj.scale = obj.scale * scale
+            obj.location += offset
         bpy.context.view_layer.update()
 
-        # Recompute bounding box and translate to origin
-        bbox_min, bbox_max = self.bbox
-        offset = -(bbox_min + bbox_max) / 2
-        for obj in self.root_objects:
-            obj.matrix_world.translation += offset
-
-        bpy.ops.object.select_all(action="DESELECT")
+        # Iterate a copy, deselecting shrinks selected_objects
+        for obj in list(bpy.context.selected_objects):
+            obj.select_set(False)
 
-    def render(self):
-        bpy.context.scene.use_nodes = True
-        tree = bpy.context.scene.node_tree
+    def render(self, num_procs: int = 1):
+        scene = bpy.context.scene
+        scene.use_nodes = True
+        tree = scene.node_tree
 
         if "Render Layers" not in tree.nodes:
             rl = tree.nodes.new("CompositorNodeRLayers")
         else:
             rl = tree.nodes["Render Layers"]
-        if bpy.context.scene.frame_end != bpy.context.scene.frame_start:
-            bpy.context.scene.frame_end -= 1
-            bpy.ops.render.render(animation=True, write_still=True)
-            bpy.context.scene.frame_end += 1
+        if scene.frame_end != scene.frame_start:
+            if num_procs > 1:
+                render_parallel(num_procs)
+                return
+            if scene.render.is_movie_format:
+                # Movies can only be encoded by an animation render, which
+                # includes frame_end, one past the last registered pose
+                scene.frame_end -= 1
+                try:
+                    bpy.ops.render.render(animation=True)
+                finally:
+                    scene.frame_end += 1
+                return
+
+            # Render frame by frame, still renders write to render.filepath as is,
+            # so point it to the frame numbered path an animation render would use
+            frames = range(scene.frame_start, scene.frame_end)
+            frame_paths = [scene.render.frame_path(frame=frame) for frame in frames]
+            filepath = scene.render.filepath
+            frame_current = scene.frame_current
+            try:
+                for frame, frame_path in zip(frames, frame_paths):
+                    scene.frame_set(frame)
+                    scene.render.filepath = frame_path
+                    bpy.ops.render.render(write_still=True)
+            finally:
+                scene.render.filepath = filepath
+                scene.frame_set(frame_current)
         else:
             raise RuntimeError(
                 "No camera poses have been registered, therefore nothing can be rendered. A camera "
@@ -166,17 +277,51 @@ class SceneHandler:
             )
 
     def clear_scene(self):
-        bpy.ops.object.select_all(action="SELECT")
-        bpy.ops.object.delete()
-        bpy.context.scene.use_nodes = True
+        self._invalidate_object_cache()
+        # Remove all objects in one go, without the operators' per-object overhead
+        bpy.data.batch_remove(list(bpy.data.objects))
+        scene = bpy.context.scene
+        scene.use_nodes = True
 
-        node_tree = bpy.context.scene.node_tree
+        node_tree = scene.node_tree
         # Clear all nodes
         for node in node_tree.nodes:
             node_tree.nodes.remove(node)
 
         # Reset keyframes
-        bpy.context.scene.frame_start = 0
-        bpy.context.scene.frame_end = 0
-        for a in bpy.data.actions:
-            bpy.data.actions.remove(a)
+        scene.frame_start = 0
+        scene.frame_end = 0
+        bpy.data.batch_remove(list(bpy.data.actions))
+
+
+def _get_meshes_bbox(meshes, ignore_matrix=False) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute the (3,) min and max corners of the bounding box of the meshes.
+
+    The corners of all meshes are gathered into one (N, 8, 3) array and transformed
+    with a single batched product instead of one product per mesh.
+    """
+    local_corners = {}
+    corners = []
+    matrices = []
+    for obj in meshes:
+        # Instances of the same mesh data share their local bounding box, unless
+        # modifiers make their evaluated geometry differ
+        key = obj.data if len(obj.modifiers) == 0 else obj
+        if key in local_corners:
+            if ignore_matrix:
+                # Same corners as an instance already accounted for
+                continue
+        else:
+            local_corners[key] = np.asarray(obj.bound_box, dtype=np.float32)
+        corners.append(local_corners[key])
+        if not ignore_matrix:
+            matrices.append(np.asarray(obj.matrix_world, dtype=np.float32))
+
+    corners = np.stack(corners)  # (N, 8, 3)
+    if not ignore_matrix:
+        matrices = np.stack(matrices)  # (N, 4, 4)
+        corners = np.einsum("nij,nkj->nki", matrices[:, :3, :3], corners)
+        corners += matrices[:, None, :3, 3]
+
+    corners = corners.reshape(-1, 3)
+    return corners.min(axis=0), corners.max(axis=0)
@@ -1,35 +1,172 @@
+import contextlib
+import functools
+
+import bpy
 import numpy as np
 
+# local2world matrices by (object pointer, frame) while cache_local2world_mats is
+# active, None otherwise
+_world_mat_cache = None
+
+
+@contextlib.contextmanager
+def cache_local2world_mats():
+    """Cache the results of ``get_local2world_mat`` per object and frame.
+
+    Only for blocks that don't change any transforms other than by changing the
+    frame. The cache is dropped on exit.
+    """
+    global _world_mat_cache
+    if _world_mat_cache is not None:
+        # Nested, the outer block owns the cache
+        yield
+        return
+
+    _world_mat_cache = {}
+    try:
+        yield
+    finally:
+        _world_mat_cache = None
+
 
 def get_local2world_mat(blender_obj) -> np.ndarray:
     """Returns the pose of the object in the form of a local2world matrix.
+
+    Inside ``cache_local2world_mats`` the result is cached and returned read-only.
     :return: The 4x4 local2world matrix.
     """
+    if _world_mat_cache is None:
+        return _compute_local2world_mat(blender_obj)
+
+    key = (blender_obj.as_pointer(), bpy.context.scene.frame_current)
+    matrix_world = _world_mat_cache.get(key)
+    if matrix_world is None:
+        matrix_world = _compute_local2world_mat(blender_obj)
+        matrix_world.flags.writeable = False
+        _world_mat_cache[key] = matrix_world
+
+    return matrix_world
+
+
+def _compute_local2world_mat(blender_obj) -> np.ndarray:
     obj = blender_obj
     # Start with local2parent matrix (if obj has no parent, that equals local2world)
-    matrix_world = obj.matrix_basis
+    matrices = [np.asarray(obj.matrix_basis, dtype=np.float64)]
 
     # Go up the scene graph along all parents
     while obj.parent is not None:
         # Add transformation to parent frame
-        matrix_world = (
-            obj.parent.matrix_basis @ obj.matrix_parent_inverse @ matrix_world
-        )
+        matrices.append(np.asarray(obj.matrix_parent_inverse, dtype=np.float64))
+        matrices.append(np.asarray(obj.parent.matrix_basis, dtype=np.float64))
         obj = obj.parent
 
-    return np.array(matrix_world)
+    # Multiply the whole chain root first in NumPy
+    return functools.reduce(np.matmul, reversed(matrices))
+
+
+def insert_keyframes(
+    id_data, data_path: str, frames: np.ndarray, values: np.ndarray, index: int = 0
+):
+    """Insert keyframes for one animated channel in a single bulk write.
+
+    Much cheaper than calling ``keyframe_insert`` once per frame. Existing
+    keyframes of the channel are kept.
+
+    :param id_data: The ID data block owning the animated property.
+    :param data_path: Path to the property, relative to ``id_data``.
+    :param frames: The (N,) frames to insert keyframes at.
+    :param values: The (N,) values of the property at those frames.
+    :param index: Array index of the property channel.
+    """
+    if id_data.animation_data is None:
+        id_data.animation_data_create()
+    if id_data.animation_data.action is None:
+        id_data.animation_data.action = bpy.data.actions.new(name=id_data.name)
+
+    fcurves = id_data.animation_data.action.fcurves
+    fcurve = fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = fcurves.new(data_path, index=index)
+
+    keyframe_points = fcurve.keyframe_points
+    num_existing = len(keyframe_points)
+    keyframe_points.add(len(frames))
+
+    co = np.empty(2 * len(keyframe_points), dtype=np.float32)
+    keyframe_points.foreach_get("co", co)
+    co[2 * num_existing :: 2] = frames
+    co[2 * num_existing + 1 :: 2] = values
+    keyframe_points.foreach_set("co", co)
+    fcurve.update()
+
+
+# Jitted compositing kernel, None until built and False without numba, see
+# _get_composite_kernel
+_composite = None
+
+
+def _get_composite_kernel():
+    """Get the numba compositing kernel, or None if numba is not installed.
+
+    numba is imported and the kernel compiled on first use only, so importing the
+    toolbox doesn't pay for numba's startup.
+    """
+    global _composite
+    if _composite is None:
+        try:
+            import numba
+        except ImportError:
+            _composite = False
+            return None
+
+        @numba.njit(parallel=True, fastmath=True, cache=True)
+        def composite(rgba, background, out):
+            """Alpha composite (N, 4) uint8 pixels onto the background, one pass.
+
+            Same rounding as the NumPy integer blend in ``rgba_to_rgb``.
+            """
+            for i in numba.prange(rgba.shape[0]):
+                alpha = np.uint32(rgba[i, 3])
+                for c in range(3):
+                    num = alpha * rgba[i, c] + (255 - alpha) * background[c] + 127
+                    out[i, c] = np.uint8(num // 255)
+
+        _composite = composite
+
+    return _composite or None
 
 
 def rgba_to_rgb(rgba_image, bg_color=[255, 255, 255]):
-    background = np.array(bg_color)
+    composite = _get_composite_kernel() if rgba_image.dtype == np.uint8 else None
+    if composite is not None:
+        pixels = np.ascontiguousarray(rgba_image).reshape(-1, 4)
+        rgb_image = np.empty((pixels.shape[0], 3), dtype=np.uint8)
+        composite(pixels, np.asarray(bg_color, dtype=np.uint32), rgb_image)
+        return rgb_image.reshape(rgba_image.shape[:-1] + (3,))
 
-    # Separate the foreground and alpha
-    foreground = rgba_image[..., :3]
-    alpha = rgba_image[..., 3:]
+    if rgba_image.dtype == np.uint8:
+        # round((alpha * fg + (255 - alpha) * bg) / 255) in uint16, no float
+        # round trip. The numerator stays below 2**16 for 8 bit inputs
+        alpha = rgba_image[..., 3:].astype(np.uint16)
+        rgb_image = rgba_image[..., :3].astype(np.uint16)
+        rgb_image *= alpha
+        rgb_image += (255 - alpha) * np.asarray(bg_color, dtype=np.uint16)
+        rgb_image += 127
+        # Exact x // 255 for these x, without a division
+        rgb_image += (rgb_image >> 8) + 1
+        rgb_image >>= 8
+        return rgb_image.astype(np.uint8)
 
-    foreground = foreground.astype(float)
-    background = background.astype(float)
-    alpha = alpha.astype(float) / 255
+    background = np.asarray(bg_color, dtype=np.float32)
+
+    # Separate the foreground and alpha
+    alpha = rgba_image[..., 3:].astype(np.float32)
+    alpha *= 1.0 / 255
 
-    rgb_image = alpha * foreground + (1 - alpha) * background
+    # alpha * fg + (1 - alpha) * bg == alpha * (fg - bg) + bg, computed in place in
+    # float32 so only one image-sized temporary is allocated
+    rgb_image = rgba_image[..., :3].astype(np.float32)
+    rgb_image -= background
+    rgb_image *= alpha
+    rgb_image += background
     return rgb_image.astype(np.uint8)